@@ -6,10 +6,10 @@ from datetime import datetime
 import time
 import random, sys
 import json
+from collections import deque
 from uuid import uuid4
 from langchain_core.messages import HumanMessage, AIMessage
-from src.graph import build_graph
-from vectorstore import load_db
+from src.session_store import get_session
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,6 +26,8 @@ theme_description = os.getenv("THEME_DESCRIPTION")
 fun_facts_file = os.getenv("FUN_FACTS_FILE")
 logo_path = os.getenv("LOGO_PATH")
 welcome_message = os.getenv("WELCOME_MESSAGE", f"Welcome to {project_name}!")
+history_page_size = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+api_url = os.getenv("HERITAGE_API_URL")  # When set, chat goes through server.py instead of an in-process graph
 
 # Load fun facts from a file
 try:
@@ -138,19 +140,46 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+def render_turn(entry):
+    st.markdown(f"<div class='chat-message-user'>You: {entry['query']}</div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='chat-message-ai'>{project_name}: {entry['response']}</div>", unsafe_allow_html=True)
+
+def ask_api(user_input):
+    # Thin-client mode: the HTTP service keeps the conversation state per thread_id
+    if "api_thread_id" not in st.session_state:
+        st.session_state.api_thread_id = str(uuid4())
+    try:
+        reply = requests.post(
+            f"{api_url.rstrip('/')}/chat",
+            json={"message": user_input, "thread_id": st.session_state.api_thread_id},
+            timeout=float(os.getenv("REQUEST_TIMEOUT", "60")) + 5
+        )
+        if reply.status_code == 503:
+            return {"response": "The service is busy right now. Please try again in a moment.", "datasource": "off_topic"}
+        reply.raise_for_status()
+        return reply.json()
+    except Exception as e:
+        st.error(f"Error contacting {project_name} service: {e}")
+        return {"response": "I don’t know.", "datasource": "off_topic"}
+
 def main():
-    # Initialize vector store and retriever
-    if "vector_store" not in st.session_state or "ensemble_retriever" not in st.session_state:
-        reset_db = os.getenv("RESET_DB", "False").lower() == "true"
-        vector_store, ensemble_retriever = load_db(reset=reset_db)
-        st.session_state.vector_store = vector_store
-        st.session_state.ensemble_retriever = ensemble_retriever
-    else:
-        vector_store = st.session_state.vector_store
-        ensemble_retriever = st.session_state.ensemble_retriever
+    if not api_url:
+        # Imported here so thin-client mode never loads the embedding model or the graph
+        from src.graph import build_graph
+        from vectorstore import load_db
+
+        # Initialize vector store and retriever
+        if "vector_store" not in st.session_state or "ensemble_retriever" not in st.session_state:
+            reset_db = os.getenv("RESET_DB", "False").lower() == "true"
+            vector_store, ensemble_retriever = load_db(reset=reset_db)
+            st.session_state.vector_store = vector_store
+            st.session_state.ensemble_retriever = ensemble_retriever
+        else:
+            vector_store = st.session_state.vector_store
+            ensemble_retriever = st.session_state.ensemble_retriever
 
-    app = build_graph(ensemble_retriever)
-    config = {"configurable": {"thread_id": str(uuid4())}}
+        app = build_graph(ensemble_retriever)
+        config = {"configurable": {"thread_id": str(uuid4())}}
 
     # Streamlit app
     st.title(project_name)
@@ -193,8 +222,16 @@ def main():
                 pass
 
     # Session state
-    if "query_history" not in st.session_state:
-        st.session_state.query_history = []
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = str(uuid4())
+    # Recent turns in memory, older ones spilled to SQLite (see src/session_store.py)
+    query_history = get_session(st.session_state.session_id)
+    if st.session_state.get("history_token") != query_history.token:
+        if "history_token" in st.session_state:
+            # The session was evicted while idle; drop the graph context that went with its history
+            for key in ("summary", "chat_messages", "last_datasource", "api_thread_id"):
+                st.session_state.pop(key, None)
+        st.session_state.history_token = query_history.token
     if "last_datasource" not in st.session_state:
         st.session_state.last_datasource = "off_topic"
     if "page" not in st.session_state:
@@ -202,7 +239,10 @@ def main():
     if "summary" not in st.session_state:
         st.session_state.summary = ""
     if "chat_messages" not in st.session_state:
-        st.session_state.chat_messages = []
+        # Older context is carried by the summary. The window is odd so the graph always
+        # sees H, A, ..., H as it did with the full list, which keeps the summarizer's
+        # even-length trigger (and so its call count) unchanged
+        st.session_state.chat_messages = deque(maxlen=11)
 
     # Update page
     page = st.session_state.page
@@ -241,30 +281,37 @@ def main():
 
     # Chat Page
     if page == "Chat":
-        for entry in st.session_state.query_history:
-            st.markdown(f"<div class='chat-message-user'>You: {entry['query']}</div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='chat-message-ai'>{project_name}: {entry['response']}</div>", unsafe_allow_html=True)
+        earlier_count = len(query_history) - len(query_history.recent)
+        if earlier_count and st.checkbox(f"Show {earlier_count} earlier messages"):
+            for entry in query_history.earlier():
+                render_turn(entry)
+        for entry in query_history.recent:
+            render_turn(entry)
         user_input = st.chat_input(f"Ask about {theme_description}:")
         if user_input:
             st.markdown(f"<div class='chat-message-user'>You: {user_input}</div>", unsafe_allow_html=True)
             st.session_state.chat_messages.append(HumanMessage(content=user_input))
-            state = {"messages": st.session_state.chat_messages, "summary": st.session_state.summary}
+            state = {"messages": list(st.session_state.chat_messages), "summary": st.session_state.summary}
             st.session_state.searching = True
             
             # Single invocation with uniform spinner
             show_spinner = os.getenv("SHOW_SPINNER", "true").lower() == "true"
+            run = (lambda: ask_api(user_input)) if api_url else (lambda: app.invoke(state, config))
             if show_spinner:
                 with st.spinner("Responding..."):
-                    result = app.invoke(state, config)
+                    result = run()
             else:
                 status_placeholder = st.empty()
                 status_placeholder.markdown("<div class='thinking-message'>Thinking...</div>", unsafe_allow_html=True)
-                result = app.invoke(state, config)
+                result = run()
             
             response = "I don’t know."
             datasource = result.get("last_datasource", "off_topic")
             documents = result.get("documents", [])
-            for msg in reversed(result['messages']):
+            if api_url:
+                response = result.get("response", response)
+                datasource = result.get("datasource", datasource)
+            for msg in reversed(result.get('messages', [])):
                 if isinstance(msg, AIMessage):
                     if msg.content in ["search_database", "web_search", "off_topic"]:
                         datasource = msg.content
@@ -278,7 +325,7 @@ def main():
             if 'status_placeholder' in locals():
                 status_placeholder.empty()
             st.markdown(f"<div class='chat-message-ai'>{project_name}: {response}</div>", unsafe_allow_html=True)
-            st.session_state.query_history.append({
+            query_history.append({
                 "query": user_input,
                 "response": response,
                 "datasource": datasource,
@@ -290,31 +337,23 @@ def main():
     # Statistics Page
     if page == "Statistics":
         st.markdown(f"### {project_name} Insights")
-        if not st.session_state.query_history:
+        if not query_history:
             st.write("No queries yet. Start chatting to see stats!")
         else:
             st.subheader("Query Metrics")
-            datasource_counts = {"Web Search": 0, "Database": 0, "Off-Topic": 0}
-            for entry in st.session_state.query_history:
-                if entry["datasource"] == "web_search":
-                    datasource_counts["Web Search"] += 1
-                elif entry["datasource"] == "search_database":
-                    datasource_counts["Database"] += 1
-                else:
-                    datasource_counts["Off-Topic"] += 1
-            total_queries = len(st.session_state.query_history)
+            total_queries = len(query_history)
+            datasource_counts = {
+                "Web Search": query_history.datasource_counts.get("web_search", 0),
+                "Database": query_history.datasource_counts.get("search_database", 0)
+            }
+            datasource_counts["Off-Topic"] = total_queries - datasource_counts["Web Search"] - datasource_counts["Database"]
             col1, col2, col3, col4 = st.columns(4)
             with col1: st.metric("Total Queries", total_queries)
             with col2: st.metric("Web Searches", datasource_counts["Web Search"])
             with col3: st.metric("Database Searches", datasource_counts["Database"])
             with col4: st.metric("Off-Topic Queries", datasource_counts["Off-Topic"])
             st.subheader("Query Topics Distribution")
-            topic_counts = {"Art": 0, "Culture": 0, "Other": 0}
-            for entry in st.session_state.query_history:
-                query_lower = entry["query"].lower()
-                if "art" in query_lower: topic_counts["Art"] += 1
-                elif "culture" in query_lower: topic_counts["Culture"] += 1
-                else: topic_counts["Other"] += 1
+            topic_counts = dict(query_history.topic_counts)
             total_topic_queries = sum(topic_counts.values())
             if total_topic_queries > 0:
                 fig_pie = px.pie(
@@ -329,12 +368,7 @@ def main():
                 st.write("No topic data to display yet. Try making some queries!")
             
             st.subheader("Query Topics")
-            topic_counts = {"Art": 0, "Culture": 0, "Other": 0}
-            for entry in st.session_state.query_history:
-                query_lower = entry["query"].lower()
-                if "art" in query_lower: topic_counts["Art"] += 1
-                elif "culture" in query_lower: topic_counts["Culture"] += 1
-                else: topic_counts["Other"] += 1
+            topic_counts = dict(query_history.topic_counts)
             total_topic_queries = sum(topic_counts.values())
             if total_topic_queries > 0:
                 fig_bar = px.bar(
@@ -347,8 +381,11 @@ def main():
             else:
                 st.write("No topic data to display yet. Try asking about art or culture!")
             st.subheader("Query History")
+            # Read one page at a time from the session store
+            page_count = (total_queries + history_page_size - 1) // history_page_size
+            history_page = st.number_input("Page", min_value=1, max_value=page_count, value=page_count) if page_count > 1 else 1
             query_data = []
-            for entry in st.session_state.query_history:
+            for entry in query_history.history(offset=(history_page - 1) * history_page_size, limit=history_page_size):
                 docs = entry["documents"]
                 doc_titles = [doc.page_content[:50] + "..." if len(doc.page_content) > 50 else doc.page_content for doc in docs] if docs else ["No documents"]
                 query_data.append({
@@ -0,0 +1,176 @@
+import os, sys
+import json
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from uuid import uuid4
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+from src.graph import build_graph
+from src.coalesce import coalescing_stats
+from src.serving import Overloaded, AdmissionController, ThreadJanitor, run_turn
+from vectorstore import load_db
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configure console for UTF-8
+try:
+    sys.stdout.reconfigure(encoding='utf-8')
+except AttributeError:
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))  # Graph runs in flight at once
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "32"))  # Requests allowed to wait for a slot
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "60"))  # Seconds, queueing included
+THREAD_IDLE_TTL = float(os.getenv("THREAD_IDLE_TTL", "3600"))  # Seconds before an idle conversation is dropped
+MAX_THREADS = int(os.getenv("MAX_THREADS", "10000"))  # Conversations kept in memory at most
+
+
+class TurnStreamingResponse(StreamingResponse):
+    """Streaming response that runs `on_close` however it ends.
+
+    A generator's `finally` does not run if the client disconnects before the
+    first chunk is pulled, so the turn is cancelled here instead.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+class ChatRequest(BaseModel):
+    message: str
+    thread_id: str | None = None
+    timeout: float | None = None
+
+
+def extract_response(messages):
+    # Same selection the Streamlit app applies to the final state
+    response = "I don’t know."
+    datasource = "off_topic"
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage):
+            if msg.content in ["search_database", "web_search", "off_topic"]:
+                datasource = msg.content
+            elif msg.content and not msg.content.startswith("Route to"):
+                response = msg.content
+                break
+    return response, datasource
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@asynccontextmanager
+async def lifespan(app):
+    reset_db = os.getenv("RESET_DB", "False").lower() == "true"
+    vector_store, ensemble_retriever = load_db(reset=reset_db)
+    # One compiled graph per process; conversation state lives in its checkpointer per thread_id
+    checkpointer = MemorySaver()
+    app.state.graph = build_graph(ensemble_retriever, checkpointer=checkpointer)
+    app.state.threads = ThreadJanitor(checkpointer, THREAD_IDLE_TTL, MAX_THREADS)
+    app.state.admission = AdmissionController(MAX_CONCURRENCY, MAX_QUEUE)
+    yield
+
+
+app = FastAPI(title=os.getenv("PROJECT_NAME", "Heritage AI"), lifespan=lifespan)
+
+
+async def admit(request: ChatRequest):
+    timeout = min(request.timeout or REQUEST_TIMEOUT, REQUEST_TIMEOUT)
+    deadline = time.monotonic() + timeout
+    try:
+        await app.state.admission.acquire(deadline)
+    except Overloaded:
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly.", headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out waiting for a free slot.")
+    return deadline
+
+
+def graph_inputs(request: ChatRequest):
+    thread_id = request.thread_id or str(uuid4())
+    app.state.threads.begin(thread_id)
+    # Only the new turn is sent; earlier turns and the summary come from the checkpointer
+    return thread_id, {"messages": [HumanMessage(content=request.message)]}
+
+
+def finish(thread_id):
+    app.state.threads.end(thread_id)
+    app.state.admission.release()
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    deadline = await admit(request)
+    thread_id, inputs = graph_inputs(request)
+    try:
+        # Waiting behind an earlier turn on the same thread counts towards the deadline
+        turn = run_turn(app.state.graph, app.state.threads, thread_id, inputs)
+        messages, summary = await asyncio.wait_for(turn, timeout=max(deadline - time.monotonic(), 0))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded.")
+    finally:
+        finish(thread_id)
+    response, datasource = extract_response(messages)
+    return {"thread_id": thread_id, "response": response, "datasource": datasource, "summary": summary}
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    # Admission happens before the response starts so overload still maps to a status code
+    deadline = await admit(request)
+    thread_id, inputs = graph_inputs(request)
+    events = asyncio.Queue()
+    events.put_nowait(sse("start", {"thread_id": thread_id}))
+
+    async def on_message(msg):
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            events.put_nowait(sse("tool", {"tools": [call["name"] for call in msg.tool_calls]}))
+
+    async def produce():
+        # The turn runs as its own task so the thread lock is never held across a yield to the client
+        try:
+            turn = run_turn(app.state.graph, app.state.threads, thread_id, inputs, on_message=on_message)
+            messages, _ = await asyncio.wait_for(turn, timeout=max(deadline - time.monotonic(), 0))
+            response, datasource = extract_response(messages)
+            events.put_nowait(sse("message", {"response": response, "datasource": datasource}))
+            events.put_nowait(sse("done", {"thread_id": thread_id}))
+        except asyncio.TimeoutError:
+            events.put_nowait(sse("error", {"detail": "Request deadline exceeded."}))
+        except Exception as e:
+            events.put_nowait(sse("error", {"detail": f"Error generating response: {e}"}))
+        finally:
+            events.put_nowait(None)
+
+    task = asyncio.create_task(produce())
+    # Done callbacks run even when the task is cancelled before it starts
+    task.add_done_callback(lambda _: finish(thread_id))
+
+    async def stream():
+        while (event := await events.get()) is not None:
+            yield event
+
+    return TurnStreamingResponse(stream(), on_close=task.cancel, media_type="text/event-stream")
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "admission": app.state.admission.stats(), "threads": app.state.threads.stats(), "coalescing": coalescing_stats()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("server:app", host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")))
@@ -0,0 +1,206 @@
+"""Versioned, prebuilt index snapshots for fast replica cold start.
+
+A snapshot is a single file holding everything `load_db` would otherwise
+rebuild: the embedding vectors, the documents and their metadata, the
+embedding model id and a fingerprint of the source corpus. The same vectors
+back both the similarity retriever and the SVM retriever, so nothing is
+re-embedded on load; the vectors are memory-mapped rather than read.
+
+Layout: 8-byte magic, uint32 schema version, uint64 header length, UTF-8 JSON
+header, zero padding to a 64-byte boundary, then a float32 matrix
+(count x dim) in row-major order.
+
+    python snapshot.py export ./index.snapshot
+    python snapshot.py inspect ./index.snapshot
+"""
+import os
+import sys
+import json
+import struct
+import hashlib
+from datetime import datetime, timezone
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain.retrievers import EnsembleRetriever
+from langchain_community.retrievers import SVMRetriever
+
+MAGIC = b"HRTGIDX\0"
+SCHEMA_VERSION = 1
+PREFIX = struct.Struct("<8sIQ")  # magic, schema version, header length
+ALIGNMENT = 64
+
+
+class SnapshotMismatchError(ValueError):
+    """The snapshot cannot be used with this build (schema, model or corpus differs, or it is damaged)."""
+
+
+def corpus_fingerprint(data_path):
+    """SHA-256 over the relative path and contents of every PDF under `data_path`."""
+    digest = hashlib.sha256()
+    paths = []
+    for root, _, files in os.walk(data_path):
+        paths.extend(os.path.join(root, name) for name in files if name.endswith(".pdf"))
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, data_path).replace(os.sep, "/").encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def embedding_model_id(embeddings_model, backend=None):
+    # Vectors from different inference backends are close but not identical
+    return f"{embeddings_model}@{(backend or os.getenv('EMBEDDINGS_BACKEND', 'torch')).lower()}"
+
+
+def _vectors_offset(header_length):
+    end = PREFIX.size + header_length
+    return (end + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def export_snapshot(path, vectors, documents, model_id, fingerprint):
+    """Write `vectors` (count x dim) and their `documents` to a snapshot file at `path`."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or len(vectors) != len(documents):
+        raise ValueError(f"Expected one vector per document, got {vectors.shape} for {len(documents)} documents.")
+    header = json.dumps({
+        "schema_version": SCHEMA_VERSION,
+        "embedding_model": model_id,
+        "corpus_fingerprint": fingerprint,
+        "count": vectors.shape[0],
+        "dim": vectors.shape[1],
+        "dtype": "float32",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "documents": [{"page_content": doc.page_content, "metadata": doc.metadata or {}} for doc in documents],
+    }, ensure_ascii=False).encode("utf-8")
+    offset = _vectors_offset(len(header))
+
+    # Write to a temporary file first so a reader never sees a half-written snapshot
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, SCHEMA_VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * (offset - PREFIX.size - len(header)))
+        f.write(vectors.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        prefix = f.read(PREFIX.size)
+        if len(prefix) != PREFIX.size:
+            raise SnapshotMismatchError(f"{path} is too short to be an index snapshot.")
+        magic, version, header_length = PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise SnapshotMismatchError(f"{path} is not an index snapshot.")
+        if version != SCHEMA_VERSION:
+            raise SnapshotMismatchError(f"Snapshot schema version {version} is not supported (expected {SCHEMA_VERSION}).")
+        try:
+            header = json.loads(f.read(header_length).decode("utf-8"))
+        except ValueError as e:
+            raise SnapshotMismatchError(f"Snapshot header is corrupt: {e}")
+    header["vectors_offset"] = _vectors_offset(header_length)
+    return header
+
+
+class SnapshotIndex:
+    """Read-only vector index over a memory-mapped snapshot, standing in for the Chroma store."""
+
+    def __init__(self, vectors, documents, embeddings, header):
+        self.vectors = vectors
+        self.documents = documents
+        self.embeddings = embeddings
+        self.header = header
+
+    def similarity_search(self, query, k=4):
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        # Squared L2 distance, matching Chroma's default space
+        distances = np.einsum("ij,ij->i", self.vectors - query_vector, self.vectors - query_vector)
+        k = min(k, len(distances))
+        if k == 0:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return [self.documents[i] for i in nearest[np.argsort(distances[nearest])]]
+
+    def as_retriever(self, search_kwargs=None):
+        return SnapshotRetriever(index=self, k=(search_kwargs or {}).get("k", 4))
+
+
+class SnapshotRetriever(BaseRetriever):
+    index: SnapshotIndex
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        return self.index.similarity_search(query, k=self.k)
+
+
+def load_snapshot(path, embeddings, model_id, data_path=None):
+    """Open a snapshot and build the same (index, ensemble_retriever) pair as `load_db`.
+
+    Raises SnapshotMismatchError when the schema or embedding model differ, when
+    `data_path` is given and its corpus no longer matches, or when the file is damaged.
+    """
+    header = read_header(path)
+    if header.get("embedding_model") != model_id:
+        raise SnapshotMismatchError(f"Snapshot was built with {header.get('embedding_model')}, but this build uses {model_id}.")
+    if data_path and header.get("corpus_fingerprint") != corpus_fingerprint(data_path):
+        raise SnapshotMismatchError(f"Snapshot does not match the documents in {data_path}.")
+    count, dim = header["count"], header["dim"]
+    if count == 0:
+        raise SnapshotMismatchError(f"{path} contains no documents.")
+    if os.path.getsize(path) < header["vectors_offset"] + count * dim * 4:
+        raise SnapshotMismatchError(f"{path} is truncated.")
+
+    vectors = np.memmap(path, dtype=np.float32, mode="r", offset=header["vectors_offset"], shape=(count, dim))
+    documents = [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in header.pop("documents")]
+
+    index = SnapshotIndex(vectors, documents, embeddings, header)
+    similarity_retriever = index.as_retriever(search_kwargs={"k": 5})
+    svm_retriever = SVMRetriever(
+        embeddings=embeddings,
+        index=vectors,
+        texts=[doc.page_content for doc in documents],
+        metadatas=[doc.metadata for doc in documents]
+    )
+    ensemble_retriever = EnsembleRetriever(retrievers=[similarity_retriever, svm_retriever], weights=[0.7, 0.3])
+    return index, ensemble_retriever
+
+
+def export_from_data(path):
+    """Load and embed the PDFs under DATA_PATH and export them to `path`.
+
+    The corpus is always embedded afresh (never taken from an existing Chroma
+    directory or snapshot), so the vectors and the fingerprint describe the same files.
+    """
+    from langchain_community.document_loaders import DirectoryLoader, PyMuPDFLoader
+    from src.embeddings import load_embeddings
+
+    data_path = os.getenv("DATA_PATH")
+    if not data_path or not os.path.exists(data_path):
+        raise ValueError(f"DATA_PATH ({data_path}) must point to the PDF directory to export.")
+    embeddings_model = os.getenv("EMBEDDINGS")
+    fingerprint = corpus_fingerprint(data_path)
+    documents = DirectoryLoader(data_path, glob="**/*.pdf", show_progress=True, loader_cls=PyMuPDFLoader).load()
+    if not documents:
+        raise ValueError(f"No PDF files found in {data_path}.")
+    vectors = load_embeddings(embeddings_model).embed_documents([doc.page_content for doc in documents])
+    export_snapshot(path, vectors, documents, embedding_model_id(embeddings_model), fingerprint)
+    print(f"Exported {len(documents)} documents to {path}.")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if len(sys.argv) < 2 or sys.argv[1] not in ("export", "inspect"):
+        print("Usage: python snapshot.py export|inspect [path]")
+        sys.exit(1)
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else os.getenv("INDEX_SNAPSHOT_PATH", "./index.snapshot")
+    if sys.argv[1] == "export":
+        export_from_data(snapshot_path)
+    else:
+        info = read_header(snapshot_path)
+        info.pop("documents")
+        print(json.dumps(info, indent=2))
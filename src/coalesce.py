@@ -0,0 +1,146 @@
+import json
+import asyncio
+import threading
+from concurrent.futures import Future
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The first caller runs the function; callers that arrive while it is still
+    running wait on its future and receive the same result (or exception).
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._async_in_flight = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    async def ado(self, key, fn):
+        """Async counterpart of `do`; `fn` returns a coroutine.
+
+        The shared call runs as its own task. A cancelled caller stops waiting
+        without affecting the others, and the task itself is cancelled once no
+        caller is left waiting for it.
+        """
+        key = (id(asyncio.get_running_loop()), key)  # Tasks belong to one event loop
+        with self._lock:
+            self.calls += 1
+            entry = self._async_in_flight.get(key)
+            if entry is None:
+                entry = self._async_in_flight[key] = {"task": asyncio.ensure_future(fn()), "waiters": 0}
+                entry["task"].add_done_callback(lambda _: self._forget(key, entry))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+            entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            with self._lock:
+                entry["waiters"] -= 1
+                abandoned = entry["waiters"] == 0 and not entry["task"].done()
+            if abandoned:
+                entry["task"].cancel()
+
+    def _forget(self, key, entry):
+        with self._lock:
+            if self._async_in_flight.get(key) is entry:
+                del self._async_in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight) + len(self._async_in_flight)
+            return {"calls": self.calls, "executed": self.executed, "saved": self.coalesced, "in_flight": in_flight}
+
+
+retrieval_flight = SingleFlight("search_database")
+search_flight = SingleFlight("web_search")
+llm_flight = SingleFlight("llm")
+
+
+def coalescing_stats():
+    return {flight.name: flight.stats() for flight in (retrieval_flight, search_flight, llm_flight)}
+
+
+class CoalescingRetriever(BaseRetriever):
+    """Retriever wrapper that collapses concurrent identical queries into one search."""
+
+    retriever: BaseRetriever
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        # Keyed on the wrapped retriever too, so graphs over different indexes never share results
+        key = (id(self.retriever), query)
+        return retrieval_flight.do(key, lambda: self.retriever.invoke(query, config={"callbacks": run_manager.get_child()}))
+
+
+def _message_key(message):
+    # Ids differ per conversation, so key on what the model actually sees
+    if isinstance(message, str):
+        return message
+    tool_calls = [(call["name"], call["args"]) for call in getattr(message, "tool_calls", None) or []]
+    return [message.type, message.content, tool_calls, getattr(message, "tool_call_id", None)]
+
+
+def _llm_key(llm, prompt):
+    """Coalescing key for a deterministic call, or None when `llm` samples."""
+    model = getattr(llm, "bound", llm)  # Unwrap bind_tools
+    if getattr(model, "temperature", None) != 0:
+        return None
+    messages = [prompt] if isinstance(prompt, str) else prompt
+    return json.dumps(
+        [model.model_name, getattr(llm, "kwargs", {}), [_message_key(m) for m in messages]],
+        sort_keys=True,
+        default=str
+    )
+
+
+def invoke_llm(llm, prompt):
+    """Invoke `llm`, coalescing concurrent identical calls when it is deterministic.
+
+    Only temperature 0 calls are shared; sampling calls always run on their own.
+    """
+    key = _llm_key(llm, prompt)
+    if key is None:
+        return llm.invoke(prompt)
+    return llm_flight.do(key, lambda: llm.invoke(prompt))
+
+
+async def ainvoke_llm(llm, prompt):
+    """Async counterpart of `invoke_llm`."""
+    key = _llm_key(llm, prompt)
+    if key is None:
+        return await llm.ainvoke(prompt)
+    return await llm_flight.ado(key, lambda: llm.ainvoke(prompt))
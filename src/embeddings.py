@@ -0,0 +1,129 @@
+import os
+import threading
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKENDS = ("torch", "onnx", "int8")
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """CPU sentence-transformer embeddings using ONNX Runtime or int8-quantized PyTorch.
+
+    `onnx` needs sentence-transformers>=3.2 with its onnx extra installed
+    (`pip install "sentence-transformers[onnx]"`).
+    """
+
+    def __init__(self, model_name, backend="onnx", threads=None, batch_size=32):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        if backend == "onnx":
+            import onnxruntime as ort
+
+            session_options = ort.SessionOptions()
+            if threads:
+                session_options.intra_op_num_threads = threads
+            self.client = SentenceTransformer(
+                model_name,
+                device="cpu",
+                backend="onnx",
+                model_kwargs={"provider": "CPUExecutionProvider", "session_options": session_options}
+            )
+        elif backend == "int8":
+            import torch
+
+            self.client = SentenceTransformer(model_name, device="cpu")
+            # Dynamic quantization: int8 weights for every Linear layer, activations quantized on the fly
+            torch.quantization.quantize_dynamic(self.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        else:
+            raise ValueError(f"Unsupported embeddings backend: {backend}. Choose from {', '.join(BACKENDS)}.")
+
+    def embed_documents(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.client.encode(texts, batch_size=self.batch_size, show_progress_bar=False).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class MicroBatchEmbeddings(Embeddings):
+    """Coalesce concurrent `embed_query` calls into one forward pass.
+
+    Queries arriving within `max_wait_ms` of the first waiting query (up to
+    `max_batch` of them) are embedded together on a background thread.
+    Document embedding is already batched and goes straight to the wrapped model.
+    """
+
+    def __init__(self, embeddings, max_batch=32, max_wait_ms=5):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+        self.batches = 0
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            self._cond.notify()
+        return future.result()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Give concurrent callers a short window to join this batch
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.max_wait)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self.batches += 1
+            self.queries += len(batch)
+            try:
+                vectors = self.embeddings.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+
+
+def load_embeddings(model_name=None, backend=None, threads=None, max_wait_ms=None):
+    """Build the embedding model from EMBEDDINGS* environment settings.
+
+    EMBEDDINGS_BACKEND is `torch` (default, plain PyTorch), `onnx` or `int8`;
+    EMBEDDINGS_THREADS caps CPU threads; EMBEDDINGS_BATCH_WAIT_MS > 0 enables the
+    query micro-batcher and EMBEDDINGS_MAX_BATCH bounds its batch size.
+    """
+    model_name = model_name or os.getenv("EMBEDDINGS")
+    backend = (backend or os.getenv("EMBEDDINGS_BACKEND", "torch")).lower()
+    threads = threads or int(os.getenv("EMBEDDINGS_THREADS", "0")) or None
+    if max_wait_ms is None:
+        max_wait_ms = float(os.getenv("EMBEDDINGS_BATCH_WAIT_MS", "0"))
+
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+    if backend == "torch":
+        embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    else:
+        embeddings = SentenceTransformerEmbeddings(model_name, backend=backend, threads=threads)
+
+    if max_wait_ms > 0:
+        embeddings = MicroBatchEmbeddings(embeddings, max_batch=int(os.getenv("EMBEDDINGS_MAX_BATCH", "32")), max_wait_ms=max_wait_ms)
+    return embeddings
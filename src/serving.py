@@ -0,0 +1,156 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AdmissionController:
+    """Global concurrency limit with a bounded wait queue.
+
+    At most `max_concurrency` requests run and `max_queue` more may wait;
+    anything beyond that is rejected immediately (backpressure). A request
+    that cannot get a slot before its deadline gives up.
+    """
+
+    def __init__(self, max_concurrency, max_queue):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.admitted = 0  # Running plus waiting; updated before any await so bursts see it
+        self.in_flight = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self, deadline):
+        if self.admitted >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise Overloaded()
+        self.admitted += 1
+        try:
+            if self._semaphore.locked():
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=max(deadline - time.monotonic(), 0))
+            else:
+                await self._semaphore.acquire()  # A free slot is taken without suspending
+        except asyncio.TimeoutError:
+            self.admitted -= 1
+            self.timed_out += 1
+            raise
+        except BaseException:
+            self.admitted -= 1
+            raise
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self.admitted -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.admitted - self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class ThreadJanitor:
+    """Per-thread bookkeeping for conversations held in an in-memory checkpointer.
+
+    Serializes turns on the same thread_id, remembers each thread's last
+    successful checkpoint so failed turns can be rolled back, and evicts
+    conversations: MemorySaver keeps every checkpoint of every thread_id
+    forever, so threads idle for `idle_ttl` seconds, or the least recently
+    used ones beyond `max_threads`, are dropped unless a request is using them.
+    """
+
+    def __init__(self, checkpointer, idle_ttl, max_threads):
+        self.checkpointer = checkpointer
+        self.idle_ttl = idle_ttl
+        self.max_threads = max_threads
+        self.last_used = OrderedDict()
+        self.active = {}
+        self.locks = {}
+        self.checkpoints = {}
+        self.evicted = 0
+
+    def begin(self, thread_id):
+        self.active[thread_id] = self.active.get(thread_id, 0) + 1
+        self.last_used[thread_id] = time.monotonic()
+        self.last_used.move_to_end(thread_id)
+
+    def end(self, thread_id):
+        self.active[thread_id] -= 1
+        if not self.active[thread_id]:
+            del self.active[thread_id]
+            self.locks.pop(thread_id, None)
+        self.last_used[thread_id] = time.monotonic()
+        self.last_used.move_to_end(thread_id)
+        self.sweep()
+
+    def lock(self, thread_id):
+        # Only requests between begin() and end() use the lock, so it can go when the last one ends
+        return self.locks.setdefault(thread_id, asyncio.Lock())
+
+    def sweep(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        # Oldest first, so the loop stops at the first thread that is recent and within the cap
+        for thread_id in list(self.last_used):
+            if len(self.last_used) <= self.max_threads and self.last_used[thread_id] >= cutoff:
+                break
+            if thread_id in self.active:
+                continue
+            del self.last_used[thread_id]
+            self.forget(thread_id)
+            self.evicted += 1
+
+    def forget(self, thread_id):
+        self.checkpoints.pop(thread_id, None)
+        delete_thread = getattr(self.checkpointer, "delete_thread", None)
+        if delete_thread:
+            delete_thread(thread_id)
+            return
+        # Older langgraph releases have no delete_thread; drop the thread's entries directly
+        self.checkpointer.storage.pop(thread_id, None)
+        for table in (getattr(self.checkpointer, "writes", {}), getattr(self.checkpointer, "blobs", {})):
+            for key in [key for key in table if key[0] == thread_id]:
+                del table[key]
+
+    def stats(self):
+        return {"threads": len(self.last_used), "active": len(self.active), "evicted": self.evicted, "max_threads": self.max_threads}
+
+
+async def run_turn(graph, threads, thread_id, inputs, on_message=None):
+    """Run one conversation turn from `inputs` and return (new messages, summary).
+
+    Turns on the same thread run one at a time. Each turn starts from the
+    thread's last successful checkpoint, so a turn that fails, times out or is
+    cancelled leaves nothing behind: the next turn simply forks from before it.
+    `on_message` is awaited with every message the graph produces.
+    """
+    async with threads.lock(thread_id):
+        good_checkpoint = threads.checkpoints.get(thread_id)
+        config = {"configurable": {"thread_id": thread_id}}
+        if good_checkpoint:
+            config["configurable"]["checkpoint_id"] = good_checkpoint
+        messages = []
+        try:
+            async for update in graph.astream(inputs, config, stream_mode="updates"):
+                for values in update.values():
+                    for msg in (values or {}).get("messages", []):
+                        messages.append(msg)
+                        if on_message:
+                            await on_message(msg)
+        except BaseException:
+            if not good_checkpoint:
+                # Nothing to fork from yet, so drop the partial first turn entirely
+                threads.forget(thread_id)
+            raise
+        snapshot = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+        threads.checkpoints[thread_id] = snapshot.config["configurable"]["checkpoint_id"]
+        return messages, snapshot.values.get("summary", "")
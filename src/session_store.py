@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import deque
+from uuid import uuid4
+from langchain_core.documents import Document
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "./sessions.db")
+SESSION_WINDOW = int(os.getenv("SESSION_WINDOW", "20"))  # Turns kept in memory per session
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))  # Seconds before an idle session is evicted
+
+TOPICS = {"Art": "art", "Culture": "culture"}
+
+
+def topic_of(query):
+    query_lower = query.lower()
+    for topic, keyword in TOPICS.items():
+        if keyword in query_lower:
+            return topic
+    return "Other"
+
+
+def _connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=10)
+    connection.execute("""CREATE TABLE IF NOT EXISTS turns (
+        session_id TEXT, seq INTEGER, query TEXT, response TEXT, datasource TEXT, timestamp TEXT, documents TEXT,
+        PRIMARY KEY (session_id, seq))""")
+    connection.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, last_active REAL)")
+    return connection
+
+
+class SessionStore:
+    """Bounded chat history for one session.
+
+    The last `window` turns stay in memory for rendering; every turn is also
+    written to SQLite, and older turns are only read back on demand. Aggregate
+    counts for the statistics page are kept as running totals, so memory per
+    session does not grow with the length of the conversation.
+    """
+
+    def __init__(self, session_id, db_path=SESSION_DB_PATH, window=SESSION_WINDOW):
+        self.session_id = session_id
+        self.db_path = db_path
+        self.recent = deque(maxlen=window)
+        self.total = 0
+        self.datasource_counts = {}
+        self.topic_counts = {topic: 0 for topic in [*TOPICS, "Other"]}
+        self.last_active = time.time()
+        # Changes whenever the store is rebuilt, so callers can tell an eviction happened
+        self.token = uuid4().hex
+        self._reload()
+
+    def _reload(self):
+        # Rebuild the running totals and recent window from any turns already on disk
+        connection = _connect(self.db_path)
+        try:
+            rows = connection.execute("SELECT query, datasource FROM turns WHERE session_id = ?", (self.session_id,))
+            for query, datasource in rows:
+                self.total += 1
+                self.datasource_counts[datasource] = self.datasource_counts.get(datasource, 0) + 1
+                self.topic_counts[topic_of(query)] += 1
+        finally:
+            connection.close()
+        self.recent.extend(self.history(offset=max(self.total - self.recent.maxlen, 0)))
+
+    def __len__(self):
+        return self.total
+
+    def append(self, entry):
+        """Record a turn: a dict with query, response, datasource, timestamp and documents."""
+        documents = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in entry.get("documents") or []]
+        with _connect(self.db_path) as connection:
+            connection.execute(
+                "INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.session_id, self.total, entry["query"], entry["response"], entry["datasource"], entry["timestamp"], json.dumps(documents))
+            )
+            connection.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?)", (self.session_id, time.time()))
+        connection.close()
+        self.recent.append(entry)
+        self.total += 1
+        self.datasource_counts[entry["datasource"]] = self.datasource_counts.get(entry["datasource"], 0) + 1
+        self.topic_counts[topic_of(entry["query"])] += 1
+        self.touch()
+
+    def touch(self):
+        self.last_active = time.time()
+
+    def history(self, offset=0, limit=None):
+        """Yield stored turns oldest first, reading from disk as they are consumed."""
+        connection = _connect(self.db_path)
+        try:
+            rows = connection.execute(
+                "SELECT query, response, datasource, timestamp, documents FROM turns WHERE session_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+                (self.session_id, -1 if limit is None else limit, offset)
+            )
+            for query, response, datasource, timestamp, documents in rows:
+                yield {
+                    "query": query,
+                    "response": response,
+                    "datasource": datasource,
+                    "timestamp": timestamp,
+                    "documents": [Document(**doc) for doc in json.loads(documents)],
+                }
+        finally:
+            connection.close()
+
+    def earlier(self):
+        """Turns that have already left the in-memory window."""
+        return self.history(limit=self.total - len(self.recent))
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_last_sweep = 0.0
+SWEEP_INTERVAL = 60  # Seconds between idle-session sweeps
+
+
+def evict_idle(max_idle=SESSION_IDLE_TTL, db_path=SESSION_DB_PATH):
+    """Drop sessions idle for longer than `max_idle` seconds, in memory and on disk."""
+    cutoff = time.time() - max_idle
+    with _sessions_lock:
+        for session_id in [sid for sid, store in _sessions.items() if store.last_active < cutoff]:
+            del _sessions[session_id]
+        live = [(sid, store.last_active) for sid, store in _sessions.items()]
+    with _connect(db_path) as connection:
+        # Sessions still being viewed are active even if they have not chatted recently
+        connection.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?)", live)
+        connection.execute("DELETE FROM turns WHERE session_id IN (SELECT session_id FROM sessions WHERE last_active < ?)", (cutoff,))
+        connection.execute("DELETE FROM sessions WHERE last_active < ?", (cutoff,))
+    connection.close()
+
+
+def get_session(session_id):
+    """Return the store for `session_id`, creating it if it is new or was evicted."""
+    global _last_sweep
+    if time.time() - _last_sweep >= SWEEP_INTERVAL:
+        _last_sweep = time.time()
+        evict_idle()
+    with _sessions_lock:
+        store = _sessions.get(session_id)
+        if store is None:
+            store = _sessions[session_id] = SessionStore(session_id)
+        store.touch()
+        return store
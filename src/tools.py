@@ -2,16 +2,17 @@ import os
 from langchain.tools.retriever import create_retriever_tool
 from langchain_core.tools import tool
 from langchain_community.tools import TavilySearchResults
+from .coalesce import CoalescingRetriever, search_flight
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def create_tools(ensemble_retriever):
+def create_tools(ensemble_retriever, search=None):
     theme_description = os.getenv("THEME_DESCRIPTION")  
     project_name = os.getenv("PROJECT_NAME")  
 
     retrieval_tool = create_retriever_tool(
-        ensemble_retriever,
+        CoalescingRetriever(retriever=ensemble_retriever),
         "search_database",
         f"""Searches and retrieves relevant excerpts from a collection of documents on {theme_description}, covering key topics and examples relevant to the theme."""
     )
@@ -21,13 +22,18 @@ def create_tools(ensemble_retriever):
         """
         Perform a web search using TavilySearchResults to retrieve relevant information.
         """
-        search = TavilySearchResults(max_results=3, search_depth="advanced", include_answer=True, include_raw_content=True)
-        try:
-            search_results = search.invoke(messages)
-            results = "\n".join([f"URL: {res['url']}\nContent: {res['content']}\n" for res in search_results])
-            return results
-        except Exception as e:
-            return f"Error performing web search: {e}"
+        def run_search():
+            # Any backend with invoke(query) -> [{"url", "content"}] can stand in for Tavily
+            backend = search or TavilySearchResults(max_results=3, search_depth="advanced", include_answer=True, include_raw_content=True)
+            try:
+                search_results = backend.invoke(messages)
+                results = "\n".join([f"URL: {res['url']}\nContent: {res['content']}\n" for res in search_results])
+                return results
+            except Exception as e:
+                return f"Error performing web search: {e}"
+
+        # Concurrent identical searches on the same backend share one call
+        return search_flight.do((id(search), messages), run_search)
 
     @tool
     def off_topic_tool(messages: str) -> str:
@@ -0,0 +1,111 @@
+"""Compare embedding backends for accuracy and CPU latency.
+
+Embeds a sample of pages from DATA_PATH and a set of questions with every
+backend, using plain PyTorch (the original HuggingFaceEmbeddings path) as the
+reference. Reports indexing throughput, single-query latency, concurrent query
+latency with and without the micro-batcher, cosine similarity to the reference
+vectors and top-5 retrieval agreement.
+
+    python tests/embeddings_bench.py --pages 200 --threads 4
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Add root folder to sys.path to allow imports from src and other directories
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from langchain_community.document_loaders import DirectoryLoader, PyMuPDFLoader
+from src.embeddings import BACKENDS, MicroBatchEmbeddings, load_embeddings
+from sample_questions import QUESTIONS
+
+load_dotenv()
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(query_vectors, doc_vectors, k=5):
+    return np.argsort(-(query_vectors @ doc_vectors.T), axis=1)[:, :k]
+
+
+def concurrent_query_latency(embeddings, queries, clients):
+    # Every client fires at once, as concurrent chat sessions would
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        start = time.perf_counter()
+        list(pool.map(embeddings.embed_query, queries))
+        return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends for accuracy and latency.")
+    parser.add_argument("--pages", type=int, default=100, help="Pages from DATA_PATH to embed.")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per backend (0 = library default).")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent query callers.")
+    parser.add_argument("--batch-wait-ms", type=float, default=5.0, help="Micro-batcher wait window.")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backends to compare.")
+    args = parser.parse_args()
+
+    loader = DirectoryLoader(os.getenv("DATA_PATH"), glob="**/*.pdf", loader_cls=PyMuPDFLoader)
+    texts = [doc.page_content for doc in loader.load() if doc.page_content.strip()][:args.pages]
+    queries = QUESTIONS * max(1, args.clients // len(QUESTIONS))
+    print(f"Embedding {len(texts)} pages and {len(queries)} queries with {os.getenv('EMBEDDINGS')}\n")
+
+    # The first backend is the reference, so plain PyTorch always goes first
+    backends = ["torch"] + [b for b in args.backends.split(",") if b != "torch"]
+    reference = None
+    rows = []
+    for backend in backends:
+        try:
+            embeddings = load_embeddings(backend=backend, threads=args.threads or None, max_wait_ms=0)
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        embeddings.embed_query("warm up")
+
+        start = time.perf_counter()
+        doc_vectors = normalize(embeddings.embed_documents(texts))
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        query_vectors = normalize([embeddings.embed_query(q) for q in QUESTIONS])
+        query_time = (time.perf_counter() - start) / len(QUESTIONS)
+
+        unbatched = concurrent_query_latency(embeddings, queries, args.clients)
+        batched = concurrent_query_latency(MicroBatchEmbeddings(embeddings, max_wait_ms=args.batch_wait_ms), queries, args.clients)
+
+        if reference is None:
+            reference = (doc_vectors, query_vectors, top_k(query_vectors, doc_vectors))
+        ref_docs, ref_queries, ref_top = reference
+        cosine = float(np.mean(np.sum(doc_vectors * ref_docs, axis=1)))
+        ranked = top_k(query_vectors, doc_vectors)
+        overlap = float(np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(ranked, ref_top)]))
+
+        rows.append({
+            "Backend": backend,
+            "Index pages/s": f"{len(texts) / index_time:.1f}",
+            "Query ms": f"{query_time * 1000:.1f}",
+            "Concurrent ms/query": f"{unbatched * 1000:.1f}",
+            "Micro-batched ms/query": f"{batched * 1000:.1f}",
+            "Cosine vs torch": f"{cosine:.4f}",
+            "Top-5 overlap": f"{overlap:.2f}",
+        })
+
+    if not rows:
+        print("No backend could be loaded.")
+        return
+    headers = list(rows[0].keys())
+    widths = [max(len(h), *(len(r[h]) for r in rows)) for h in headers]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(row[h].ljust(w) for h, w in zip(headers, widths)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Local stand-in for an OpenAI-compatible chat completions endpoint.
+
+Point the app at it with LLM_BASE_URL=http://127.0.0.1:8001/v1 to exercise the
+graph and the HTTP service without calling OpenRouter. Latency and token rate are
+configurable so load tests see realistic timings.
+
+    python tests/fake_llm.py --port 8001 --latency 0.3 --tokens-per-second 50
+"""
+import argparse
+import json
+import random
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import uuid4
+
+ANSWER = "Nok art is known for its terracotta sculptures from central Nigeria, dating back more than two thousand years."
+SUMMARY = "The user asked about Nok art and its terracotta sculptures."
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server_version = "FakeLLM/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        message = self.server.complete(body)
+        completion_tokens = len((message.get("content") or "").split()) or 1
+        # Fixed first-token latency plus a per-token generation cost
+        time.sleep(self.server.latency + completion_tokens / self.server.tokens_per_second)
+        payload = {
+            "id": f"chatcmpl-{uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": completion_tokens, "total_tokens": completion_tokens},
+        }
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, tokens_per_second=100.0, tool_calls=True, web_search_ratio=0.0):
+        super().__init__(address, FakeLLMHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tool_calls = tool_calls
+        self.web_search_ratio = web_search_ratio  # Share of turns routed to web_search_tool instead of search_database
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def complete(self, body):
+        with self._lock:
+            self.requests += 1
+        messages = body.get("messages", [])
+        tools = [t["function"]["name"] for t in body.get("tools", [])]
+        if not tools:
+            # The summarizer is the only call made without tools bound
+            return {"role": "assistant", "content": SUMMARY}
+        # The graph appends a system summary after the history, so look for a tool result since the latest user turn
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        answered = any(m.get("role") == "tool" for m in messages[last_user + 1:])
+        if self.tool_calls and not answered and "search_database" in tools:
+            query = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+            if "web_search_tool" in tools and random.random() < self.web_search_ratio:
+                name, arguments = "web_search_tool", {"messages": query}
+            else:
+                name, arguments = "search_database", {"query": query}
+            return {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [{
+                    "id": f"call_{uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)},
+                }],
+            }
+        return {"role": "assistant", "content": ANSWER}
+
+
+def serve_in_thread(host="127.0.0.1", port=0, **kwargs):
+    """Start a fake server on a background thread; returns (server, base_url)."""
+    server = FakeLLMServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--no-tool-calls", action="store_true", help="Answer directly instead of calling a tool.")
+    parser.add_argument("--web-search-ratio", type=float, default=0.0, help="Share of tool calls sent to web_search_tool.")
+    args = parser.parse_args()
+    server = FakeLLMServer(
+        (args.host, args.port),
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        tool_calls=not args.no_tool_calls,
+        web_search_ratio=args.web_search_ratio
+    )
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,193 @@
+"""Capacity load test for the Heritage chat graph.
+
+Drives the compiled graph from src/graph.py (with the real `load_db` retriever)
+through N simulated multi-turn conversations in one process. The LLM is the
+local fake server from fake_llm.py and web search is a fake backend, so the
+numbers reflect this replica's own overhead rather than OpenRouter or Tavily.
+
+    python tests/loadtest.py --sessions 50 --turns 5 --latency 0.3 --tokens-per-second 60
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+# Add root folder to sys.path to allow imports from src and other directories
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+from fake_llm import serve_in_thread
+from sample_questions import QUESTIONS
+
+load_dotenv()
+
+
+class FakeSearch:
+    """Stand-in for TavilySearchResults with a fixed response delay."""
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [{"url": "https://example.com/heritage", "content": f"Search results for: {query}"}]
+
+
+def rss_mb():
+    # Current resident set size; falls back to peak RSS where /proc is unavailable
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource  # Unix only; /proc covers Linux and this covers macOS
+    except ImportError:
+        return 0.0  # Not measured on Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def payload_bytes(obj):
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(payload_bytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(payload_bytes(v) for v in obj)
+    return 0
+
+
+def checkpointer_size(saver):
+    """Checkpoint count and serialized bytes held by an in-memory checkpointer."""
+    checkpoints = sum(len(ns) for thread in saver.storage.values() for ns in thread.values())
+    nbytes = payload_bytes(saver.storage) + payload_bytes(getattr(saver, "writes", {})) + payload_bytes(getattr(saver, "blobs", {}))
+    return checkpoints, nbytes
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def run_session(graph, turns, think_time, latencies, errors):
+    config = {"configurable": {"thread_id": str(uuid4())}}
+    for _ in range(turns):
+        # Only the new turn is sent; history comes from the checkpointer as in server.py
+        state = {"messages": [HumanMessage(content=random.choice(QUESTIONS))]}
+        start = time.perf_counter()
+        try:
+            await graph.ainvoke(state, config)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+        if think_time:
+            await asyncio.sleep(random.uniform(0, 2 * think_time))
+
+
+async def run_load(graph, args):
+    latencies, errors = [], []
+    pending = set()
+    ramp = args.ramp / args.sessions if args.sessions else 0
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        pending.add(asyncio.create_task(run_session(graph, args.turns, args.think_time, latencies, errors)))
+        if ramp:
+            await asyncio.sleep(ramp)
+    await asyncio.gather(*pending)
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Heritage graph with simulated chat sessions.")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated conversations.")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per conversation.")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds a user waits between turns.")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which sessions are started.")
+    parser.add_argument("--workers", type=int, default=32, help="Threads available to the graph's sync nodes.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Fake LLM generation rate.")
+    parser.add_argument("--web-search-ratio", type=float, default=0.2, help="Share of turns routed to web search.")
+    parser.add_argument("--search-latency", type=float, default=0.5, help="Fake web search seconds per call.")
+    parser.add_argument("--output", help="Optional path to write the results as JSON.")
+    args = parser.parse_args()
+
+    llm_server, base_url = serve_in_thread(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        web_search_ratio=args.web_search_ratio
+    )
+    os.environ["LLM_BASE_URL"] = base_url
+    os.environ.setdefault("OPENROUTER_API_KEY", "fake-key")
+    os.environ.setdefault("MAIN_MODEL", "fake-model")
+    os.environ.setdefault("SUB_MODEL", "fake-model")
+
+    from src.graph import build_graph
+    from vectorstore import load_db
+
+    _, ensemble_retriever = load_db()
+    search = FakeSearch(latency=args.search_latency)
+    graph = build_graph(ensemble_retriever, search=search)
+
+    rss_before = rss_mb()
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.workers))
+    latencies, errors, elapsed = loop.run_until_complete(run_load(graph, args))
+    loop.close()
+    rss_after = rss_mb()
+    checkpoints, checkpoint_bytes = checkpointer_size(graph.checkpointer)
+
+    results = {
+        "sessions": args.sessions,
+        "turns_per_session": args.turns,
+        "completed_turns": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_turns_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p90_s": round(percentile(latencies, 90), 3),
+        "latency_p99_s": round(percentile(latencies, 99), 3),
+        "latency_max_s": round(max(latencies, default=0.0), 3),
+        "rss_before_mb": round(rss_before, 1),
+        "rss_after_mb": round(rss_after, 1),
+        "rss_per_session_kb": round((rss_after - rss_before) * 1024 / args.sessions, 1) if args.sessions else 0.0,
+        "checkpoints": checkpoints,
+        "checkpoint_bytes": checkpoint_bytes,
+        "checkpoint_bytes_per_session": checkpoint_bytes // args.sessions if args.sessions else 0,
+        "checkpoint_bytes_per_turn": checkpoint_bytes // len(latencies) if latencies else 0,
+        "llm_requests": llm_server.requests,
+        "search_requests": search.calls,
+    }
+
+    print("Heritage Load Test Results")
+    print("-" * 50)
+    for key, value in results.items():
+        print(f"{key:<32}{value}")
+    if errors:
+        print(f"First error: {errors[0]}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+    llm_server.shutdown()
+    if errors and len(errors) >= len(latencies):
+        # Timings of failed turns say nothing about capacity, so do not let the run pass as a measurement
+        print(f"WARNING: {len(errors)} of {len(errors) + len(latencies)} turns failed; these results are not a valid measurement.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
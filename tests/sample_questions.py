@@ -0,0 +1,12 @@
+"""Questions shared by the load test and the embeddings benchmark."""
+
+QUESTIONS = [
+    "In which state was Nok art discovered?",
+    "Who discovered the Igbo-Ukwu art archaeological site?",
+    "In which state was Esie art discovered?",
+    "What century does Ife art date back to?",
+    "Tell me about Benin bronzes.",
+    "How do the two compare?",
+    "What materials were used to make them?",
+    "What are the major festivals of the Yoruba people?",
+]
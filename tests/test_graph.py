@@ -0,0 +1,47 @@
+"""One conversation turn through the compiled graph against the fake LLM.
+
+    python -m pytest tests/test_graph.py
+"""
+import os
+import sys
+import asyncio
+import pytest
+
+# Add root folder to sys.path to allow imports from src and other directories
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("streamlit")
+
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.retrievers import BaseRetriever
+from fake_llm import ANSWER, serve_in_thread
+
+
+class FixedRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query, *, run_manager):
+        return [Document(page_content="Nok terracottas come from central Nigeria.")]
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    server, base_url = serve_in_thread()
+    monkeypatch.setenv("LLM_BASE_URL", base_url)
+    monkeypatch.setenv("OPENROUTER_API_KEY", "fake-key")
+    monkeypatch.setenv("MAIN_MODEL", "fake-model")
+    monkeypatch.setenv("SUB_MODEL", "fake-model")
+    from src.graph import build_graph
+
+    yield build_graph(FixedRetriever())
+    server.shutdown()
+
+
+def test_turn_calls_the_database_then_answers(graph):
+    config = {"configurable": {"thread_id": "test"}}
+    result = asyncio.run(graph.ainvoke({"messages": [HumanMessage(content="Tell me about Nok art")]}, config))
+    tool_calls = [m for m in result["messages"] if isinstance(m, AIMessage) and m.tool_calls]
+    assert [call["name"] for m in tool_calls for call in m.tool_calls] == ["search_database"]
+    assert any(isinstance(m, ToolMessage) for m in result["messages"])
+    assert result["messages"][-1].content == ANSWER
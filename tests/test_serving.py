@@ -0,0 +1,141 @@
+"""Admission control, per-thread serialization and rollback in src/serving.py.
+
+    python -m pytest tests/test_serving.py
+"""
+import os
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+
+# Add root folder to sys.path to allow imports from src and other directories
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.serving import Overloaded, AdmissionController, ThreadJanitor, run_turn
+
+
+class FakeCheckpointer:
+    def __init__(self):
+        self.storage = {}
+
+    def delete_thread(self, thread_id):
+        self.storage.pop(thread_id, None)
+
+
+class FakeGraph:
+    """Appends each input message to the thread, forking from `checkpoint_id` when given."""
+
+    def __init__(self, checkpointer, delay=0.0):
+        self.checkpointer = checkpointer
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    def _latest(self, thread_id):
+        checkpoints = self.checkpointer.storage.get(thread_id, {})
+        return max(checkpoints) if checkpoints else None
+
+    async def astream(self, inputs, config, stream_mode=None):
+        thread_id = config["configurable"]["thread_id"]
+        parent = config["configurable"].get("checkpoint_id") or self._latest(thread_id)
+        history = self.checkpointer.storage.get(thread_id, {}).get(parent, [])
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            history = history + inputs["messages"]
+            # The input is checkpointed before the model runs, as langgraph does
+            self.checkpointer.storage.setdefault(thread_id, {})[f"{time.monotonic_ns():020d}{uuid4().hex}"] = history
+            await asyncio.sleep(self.delay)
+            answer = f"answer {len(history)}"
+            self.checkpointer.storage[thread_id][f"{time.monotonic_ns():020d}{uuid4().hex}"] = history + [answer]
+            yield {"assistant": {"messages": [answer]}}
+        finally:
+            self.running -= 1
+
+    async def aget_state(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_id = self._latest(thread_id)
+        values = {"messages": self.checkpointer.storage.get(thread_id, {}).get(checkpoint_id, []), "summary": ""}
+        return SimpleNamespace(config={"configurable": {"thread_id": thread_id, "checkpoint_id": checkpoint_id}}, values=values)
+
+
+def test_burst_is_bounded_by_concurrency_plus_queue():
+    async def burst():
+        admission = AdmissionController(max_concurrency=2, max_queue=3)
+        deadline = time.monotonic() + 0.2
+        results = await asyncio.gather(*(admission.acquire(deadline) for _ in range(20)), return_exceptions=True)
+        return admission, results
+
+    admission, results = asyncio.run(burst())
+    assert sum(isinstance(r, Overloaded) for r in results) == 15
+    assert sum(r is None for r in results) == 2
+    assert sum(isinstance(r, asyncio.TimeoutError) for r in results) == 3
+    assert admission.stats()["in_flight"] == 2
+    assert admission.stats()["queued"] == 0
+
+
+def test_zero_queue_admits_up_to_concurrency():
+    async def burst():
+        admission = AdmissionController(max_concurrency=2, max_queue=0)
+        results = await asyncio.gather(*(admission.acquire(time.monotonic() + 1) for _ in range(3)), return_exceptions=True)
+        admission.release()
+        await admission.acquire(time.monotonic() + 1)
+        return results
+
+    results = asyncio.run(burst())
+    assert results[:2] == [None, None]
+    assert isinstance(results[2], Overloaded)
+
+
+def test_same_thread_turns_run_one_at_a_time():
+    async def concurrent_turns():
+        checkpointer = FakeCheckpointer()
+        graph = FakeGraph(checkpointer, delay=0.01)
+        threads = ThreadJanitor(checkpointer, idle_ttl=60, max_threads=10)
+        for _ in range(3):
+            threads.begin("t")
+        await asyncio.gather(*(run_turn(graph, threads, "t", {"messages": [f"q{i}"]}) for i in range(3)))
+        for _ in range(3):
+            threads.end("t")
+        return graph, (await graph.aget_state({"configurable": {"thread_id": "t"}})).values["messages"], threads
+
+    graph, messages, threads = asyncio.run(concurrent_turns())
+    assert graph.max_running == 1
+    assert messages == ["q0", "answer 1", "q1", "answer 3", "q2", "answer 5"]
+    assert threads.locks == {}
+
+
+def test_cancelled_turn_is_rolled_back():
+    async def turns():
+        checkpointer = FakeCheckpointer()
+        graph = FakeGraph(checkpointer)
+        threads = ThreadJanitor(checkpointer, idle_ttl=60, max_threads=10)
+        threads.begin("t")
+        await run_turn(graph, threads, "t", {"messages": ["first"]})
+        graph.delay = 1
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(run_turn(graph, threads, "t", {"messages": ["lost"]}), timeout=0.01)
+        graph.delay = 0
+        messages, _ = await run_turn(graph, threads, "t", {"messages": ["second"]})
+        threads.end("t")
+        return messages, (await graph.aget_state({"configurable": {"thread_id": "t"}})).values["messages"]
+
+    messages, history = asyncio.run(turns())
+    assert messages == ["answer 3"]
+    assert history == ["first", "answer 1", "second", "answer 3"]
+
+
+def test_failed_first_turn_leaves_no_thread():
+    async def turns():
+        checkpointer = FakeCheckpointer()
+        graph = FakeGraph(checkpointer, delay=1)
+        threads = ThreadJanitor(checkpointer, idle_ttl=60, max_threads=10)
+        threads.begin("t")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(run_turn(graph, threads, "t", {"messages": ["lost"]}), timeout=0.01)
+        threads.end("t")
+        return checkpointer
+
+    assert asyncio.run(turns()).storage == {}
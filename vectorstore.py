@@ -3,8 +3,9 @@ from langchain_community.document_loaders import DirectoryLoader, PyMuPDFLoader
 from langchain_chroma import Chroma
 from langchain.retrievers import EnsembleRetriever
 from langchain_community.retrievers import SVMRetriever
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document  # Import Document class
+from src.embeddings import load_embeddings
+from snapshot import SnapshotMismatchError, embedding_model_id, load_snapshot
 from dotenv import load_dotenv
 
 # To avoid warnings in non-Streamlit contexts
@@ -18,11 +19,33 @@ load_dotenv()
 
 project = os.getenv("PROJECT_NAME")  
 embeddings_model = os.getenv("EMBEDDINGS")
-embeddings = HuggingFaceEmbeddings(model_name=embeddings_model)
+embeddings = load_embeddings(embeddings_model)  # Backend, threads and batching come from EMBEDDINGS_* settings
 
 def load_db(reset=False):
     chroma_db_path = os.getenv("CHROMA_DB_PATH", "./chroma_db")  
     data_path = os.getenv("DATA_PATH")
+    snapshot_path = os.getenv("INDEX_SNAPSHOT_PATH")
+
+    # Prefer a prebuilt snapshot; replicas then need neither DATA_PATH nor a Chroma directory
+    if not reset and snapshot_path and os.path.exists(snapshot_path):
+        try:
+            index, ensemble_retriever = load_snapshot(
+                snapshot_path,
+                embeddings,
+                embedding_model_id(embeddings_model),
+                data_path=data_path if data_path and os.path.exists(data_path) else None
+            )
+            if streamlit_available:
+                st.write(f"Database loaded from snapshot.")
+            else:
+                print(f"Database loaded from snapshot {snapshot_path}.")
+            return index, ensemble_retriever
+        except SnapshotMismatchError as e:
+            warning_msg = f"Ignoring index snapshot {snapshot_path}: {e}"
+            if streamlit_available:
+                st.warning(warning_msg)
+            else:
+                print(warning_msg)
     
     # Check if DATA_PATH is set
     if data_path is None: